@@ -4,9 +4,13 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_migrate import Migrate
 from config import config
+from app.sharding import RoutingSession, init_sharding
+from app.chat_writer import init_chat_writer
+from app.text_pipeline import init_text_pipeline
+from app.profiling import init_profiling
 
 # 初始化扩展
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 
@@ -24,16 +28,31 @@ def create_app(config_name='default'):
     jwt.init_app(app)
     migrate.init_app(app, db)
 
+    # 按用户分片（可选）
+    init_sharding(app, db)
+
+    # 聊天消息后台批量写入（可选）
+    init_chat_writer(app)
+
+    # AI长文本分块处理
+    init_text_pipeline(app)
+
     # 配置CORS
     CORS(app, origins=app.config['CORS_ORIGINS'])
 
     # 注册蓝图
-    from app.routes import auth, notes, todos, chat, ai
+    from app.routes import auth, notes, todos, chat, ai, stats, profiling
     app.register_blueprint(auth.bp)
     app.register_blueprint(notes.bp, url_prefix='/api')
     app.register_blueprint(todos.bp, url_prefix='/api')
     app.register_blueprint(chat.bp, url_prefix='/api')
     app.register_blueprint(ai.bp, url_prefix='/api')
+    app.register_blueprint(stats.bp, url_prefix='/api')
+
+    # 请求性能分析（可选，未启用时不注册任何钩子和接口）
+    if app.config['PROFILING_ENABLED']:
+        app.register_blueprint(profiling.bp, url_prefix='/api')
+        init_profiling(app)
 
     # 注册错误处理器
     register_error_handlers(app)
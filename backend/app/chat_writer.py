@@ -0,0 +1,217 @@
+import atexit
+import threading
+import time
+from datetime import date
+
+
+class FlushTicket:
+    """一批待写入消息的落盘凭据，group 模式下请求会等待它完成"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.error = None
+
+    def set(self, error=None):
+        self.error = error
+        self._event.set()
+
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        if not self._event.wait(timeout):
+            raise TimeoutError('等待聊天消息写入超时')
+        if self.error is not None:
+            raise self.error
+
+
+class ChatWriteBehind:
+    """聊天消息的后台批量写入队列（每个进程一个）
+
+    消息先进入内存队列，由后台线程每隔 CHAT_FLUSH_INTERVAL_MS 毫秒，
+    或攒够 CHAT_FLUSH_BATCH_SIZE 条时，按数据库引擎分组一次性批量插入并提交。
+
+    写入失败时：group 模式把错误返回给等待中的请求，消息不再写入；
+    async 模式把消息放回队列重试，连续失败 MAX_ATTEMPTS 次后记录错误日志并丢弃。
+    """
+
+    # async 模式下每条消息最多尝试写入的次数
+    MAX_ATTEMPTS = 3
+    # group 模式下请求等待批次提交的最长时间（秒）
+    WAIT_TIMEOUT = 10
+
+    def __init__(self, app, table):
+        self.logger = app.logger
+        self.table = table
+        self.mode = app.config['CHAT_WRITE_MODE']
+        self.interval = app.config['CHAT_FLUSH_INTERVAL_MS'] / 1000
+        self.batch_size = app.config['CHAT_FLUSH_BATCH_SIZE']
+
+        self._queue = []
+        self._inflight = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        if self.mode not in ('group', 'async'):
+            raise ValueError(f'未知的聊天消息写入模式: {self.mode}')
+
+        # 正常退出时把队列中剩余的消息写入数据库
+        atexit.register(self.close)
+
+    def enqueue(self, engine, messages):
+        """把消息放入写入队列，返回这一批消息的落盘凭据"""
+        ticket = FlushTicket()
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('聊天消息写入队列已关闭')
+            self._ensure_thread()
+            self._queue.extend((engine, message, ticket, 0) for message in messages)
+            self._cond.notify()
+
+        return ticket
+
+    def save(self, engine, messages):
+        """按配置的持久化级别保存消息：group 模式等待提交完成，async 模式立即返回"""
+        ticket = self.enqueue(engine, messages)
+        if self.mode != 'group':
+            return
+
+        try:
+            ticket.wait(timeout=self.WAIT_TIMEOUT)
+        except TimeoutError:
+            # 还没开始写入的消息直接撤回，避免请求返回失败后消息仍被写入、客户端重试时重复
+            if not self._cancel(ticket):
+                raise
+            # 已经在写入中或刚刚写完，等待这次写入的结果
+            ticket.wait(timeout=self.WAIT_TIMEOUT)
+
+    def pending_for(self, user_id):
+        """返回某个用户尚未提交到数据库的消息"""
+        with self._cond:
+            return [entry[1] for entry in self._inflight + self._queue
+                    if entry[1].user_id == user_id]
+
+    def flush(self):
+        """把当前队列中的消息批量写入数据库"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._queue = self._queue, []
+                self._inflight = batch
+
+            if not batch:
+                return
+
+            groups = {}
+            for engine, message, _, _ in batch:
+                groups.setdefault(engine, []).append(message)
+
+            # 按数据库分别提交，一个分片写入失败不影响其他分片
+            failed = {}
+            for engine, messages in groups.items():
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(self.table.insert(), [self._to_row(message) for message in messages])
+                        self._record_activity(conn, messages)
+                except Exception as e:
+                    failed[engine] = e
+                    self.logger.error(f'批量写入聊天消息失败: {str(e)}')
+
+            with self._cond:
+                self._inflight = []
+                if self.mode == 'async' and failed:
+                    retry = [(engine, message, ticket, attempts + 1)
+                             for engine, message, ticket, attempts in batch
+                             if engine in failed and attempts + 1 < self.MAX_ATTEMPTS]
+                    self._queue[:0] = retry
+                    dropped = sum(len(groups[engine]) for engine in failed) - len(retry)
+                    if dropped:
+                        self.logger.error(f'聊天消息重试 {self.MAX_ATTEMPTS} 次后仍写入失败，已丢弃 {dropped} 条')
+
+                # 与清空 _inflight 在同一个锁内完成，等待超时的请求不会看到“已写入但凭据未完成”的中间状态
+                tickets = {}
+                for engine, _, ticket, _ in batch:
+                    tickets[ticket] = tickets.get(ticket) or failed.get(engine)
+                for ticket, error in tickets.items():
+                    ticket.set(error)
+
+    def close(self):
+        """停止后台线程并写入剩余消息"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout=5)
+
+        # async 模式下失败的消息会放回队列，最多重试 MAX_ATTEMPTS 次
+        for _ in range(self.MAX_ATTEMPTS):
+            self.flush()
+            with self._cond:
+                if not self._queue:
+                    break
+
+    def _cancel(self, ticket):
+        """从队列中撤回某个凭据的消息，返回这些消息是否已经在写入中或已经写完"""
+        with self._cond:
+            if ticket.done():
+                return True
+            self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+            return any(entry[2] is ticket for entry in self._inflight)
+
+    def _record_activity(self, conn, messages):
+        """在同一事务中更新每日统计"""
+        from app.stats import apply_activity
+
+        counts = {}
+        for message in messages:
+            if message.role == 'user':
+                counts[message.user_id] = counts.get(message.user_id, 0) + 1
+
+        for user_id, count in counts.items():
+            apply_activity(conn, user_id, date.today(), chat_messages=count)
+
+    def _to_row(self, message):
+        return {
+            column.name: getattr(message, column.name)
+            for column in self.table.columns
+            if column.name != 'id'
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='chat-write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+
+                # 收到第一条消息后再等一个刷新间隔，尽量攒成一批
+                deadline = time.monotonic() + self.interval
+                while len(self._queue) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                closed = self._closed
+
+            self.flush()
+
+            if closed:
+                return
+
+
+def init_chat_writer(app):
+    """按配置启用聊天消息后台批量写入"""
+    if app.config.get('CHAT_WRITE_MODE', 'sync') == 'sync':
+        return
+
+    from app.models import ChatMessage
+    app.extensions['chat_writer'] = ChatWriteBehind(app, ChatMessage.__table__)
@@ -2,5 +2,6 @@ from .user import User
 from .note import Note
 from .todo import Todo
 from .chat import ChatMessage
+from .stats import DailyStats
 
-__all__ = ['User', 'Note', 'Todo', 'ChatMessage']
\ No newline at end of file
+__all__ = ['User', 'Note', 'Todo', 'ChatMessage', 'DailyStats']
\ No newline at end of file
@@ -0,0 +1,46 @@
+from app import db
+from datetime import datetime
+
+class DailyStats(db.Model):
+    """用户每日统计汇总模型（由笔记、待办和聊天的写入路径增量维护）"""
+
+    __tablename__ = 'daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_stats_user_day'),
+    )
+
+    # 可累加的计数字段
+    COUNTERS = (
+        'notes_created',
+        'notes_edited',
+        'todos_created',
+        'todos_completed',
+        'chars_written',
+        'chat_messages',
+        'pomodoro_sessions',
+        'pomodoro_minutes',
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+
+    notes_created = db.Column(db.Integer, default=0, nullable=False)
+    notes_edited = db.Column(db.Integer, default=0, nullable=False)
+    todos_created = db.Column(db.Integer, default=0, nullable=False)
+    todos_completed = db.Column(db.Integer, default=0, nullable=False)
+    chars_written = db.Column(db.Integer, default=0, nullable=False)  # 新增的笔记字符数
+    chat_messages = db.Column(db.Integer, default=0, nullable=False)  # 用户发送的聊天消息数
+    pomodoro_sessions = db.Column(db.Integer, default=0, nullable=False)
+    pomodoro_minutes = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DailyStats {self.user_id} {self.day}>'
+
+    def to_dict(self):
+        """转换为字典格式"""
+        data = {'date': self.day.isoformat()}
+        data.update({name: getattr(self, name) for name in self.COUNTERS})
+        return data
@@ -0,0 +1,243 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 每个请求保留的最慢SQL条数
+SLOWEST_SQL_LIMIT = 5
+
+NO_SAMPLES_HINT = '请求耗时短于采样间隔，没有采集到调用栈，可设置 PROFILING_MODE=deterministic 后重新捕获'
+
+
+class SamplingProfiler:
+    """定时采样某个线程的调用栈，开销与请求中的函数调用次数无关"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse_stack(frame)] += 1
+
+
+class TracingProfiler:
+    """确定性分析：通过 sys.setprofile 跟踪当前线程的每次调用，按调用栈累计自身耗时（微秒）
+
+    结果精确，适合很短的请求，但会明显拖慢被分析的请求。
+    """
+
+    def __init__(self):
+        self.stacks = Counter()
+        self._times = Counter()
+        self._stack = []
+        self._last = None
+
+    def start(self):
+        self._last = time.perf_counter()
+        sys.setprofile(self._callback)
+
+    def stop(self):
+        sys.setprofile(None)
+        for stack, seconds in self._times.items():
+            self.stacks[';'.join(stack)] += max(int(seconds * 1000000), 1)
+
+    def _callback(self, frame, event, arg):
+        now = time.perf_counter()
+        if self._stack:
+            self._times[tuple(self._stack)] += now - self._last
+
+        if event == 'call':
+            code = frame.f_code
+            self._stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        elif event == 'c_call':
+            self._stack.append(getattr(arg, '__qualname__', repr(arg)))
+        elif self._stack:
+            # return / c_return / c_exception；开始分析之前进入的函数返回时栈为空，直接忽略
+            self._stack.pop()
+
+        self._last = time.perf_counter()
+
+
+def _collapse_stack(frame):
+    """把调用栈转换为 collapsed-stack 格式（从外到内用分号连接）"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class ProfileStore:
+    """保存最近捕获的请求性能分析结果，超出上限时丢弃最旧的
+
+    结果只保存在当前进程的内存中：gunicorn 等多 worker 部署下每个 worker 各有一份，
+    管理接口只能看到处理该请求的 worker 捕获的结果。每条结果都带有 worker 的 pid，
+    排查时建议用单 worker 启动。
+    """
+
+    def __init__(self, max_profiles):
+        self._profiles = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def all(self):
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id):
+        with self._lock:
+            for profile in self._profiles:
+                if profile['id'] == profile_id:
+                    return profile
+        return None
+
+
+def is_privileged_request():
+    """请求头中是否带有正确的性能分析令牌"""
+    token = current_app.config['PROFILING_TOKEN']
+    provided = request.headers.get(current_app.config['PROFILING_HEADER'], '')
+    # 按字节比较：compare_digest 不接受含非 ASCII 字符的 str
+    return bool(token) and hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+def _start_profile():
+    if request.blueprint == 'profiling':
+        return
+
+    config = current_app.config
+    if not is_privileged_request() and random.random() >= config['PROFILING_SAMPLE_RATE']:
+        return
+
+    if config['PROFILING_MODE'] == 'deterministic':
+        profiler = TracingProfiler()
+    else:
+        profiler = SamplingProfiler(threading.get_ident(), config['PROFILING_INTERVAL_MS'] / 1000)
+
+    g.request_profile = {
+        'profiler': profiler,
+        'started': time.perf_counter(),
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'sql_slowest': [],
+    }
+    profiler.start()
+
+
+def _finish_profile(response):
+    state = g.pop('request_profile', None)
+    if state is None:
+        return response
+
+    state['profiler'].stop()
+    duration = time.perf_counter() - state['started']
+    stacks = state['profiler'].stacks
+
+    profile = {
+        'id': uuid.uuid4().hex[:12],
+        'created_at': datetime.utcnow().isoformat(),
+        'pid': os.getpid(),
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': response.status_code,
+        'user_id': _current_user_id(),
+        'duration_ms': round(duration * 1000, 2),
+        'mode': current_app.config['PROFILING_MODE'],
+        # sampling 模式下调用栈权重为采样次数，deterministic 模式下为微秒
+        'weight_total': sum(stacks.values()),
+        'sql': {
+            'count': state['sql_count'],
+            'total_ms': round(state['sql_time'] * 1000, 2),
+            'slowest': state['sql_slowest'],
+        },
+        'stacks': stacks,
+    }
+
+    if not stacks:
+        # 请求比采样间隔还短时一个调用栈也采不到
+        profile['hint'] = NO_SAMPLES_HINT
+
+    current_app.extensions['profiles'].add(profile)
+    return response
+
+
+def _discard_profile(error=None):
+    # 请求异常结束时 after_request 不会执行，这里确保采样线程被停止
+    state = g.pop('request_profile', None)
+    if state is not None:
+        state['profiler'].stop()
+
+
+def _current_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # 未经过 jwt_required 的接口没有用户身份
+        return None
+
+
+def _profiled_request():
+    """当前请求是否正在被性能分析"""
+    return g.get('request_profile') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profiled_request() is not None:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _profiled_request()
+    if state is None or not conn.info.get('profile_query_start'):
+        return
+
+    elapsed = time.perf_counter() - conn.info['profile_query_start'].pop()
+    state['sql_count'] += 1
+    state['sql_time'] += elapsed
+
+    slowest = state['sql_slowest']
+    slowest.append({'statement': statement, 'ms': round(elapsed * 1000, 2)})
+    slowest.sort(key=lambda item: -item['ms'])
+    del slowest[SLOWEST_SQL_LIMIT:]
+
+
+def init_profiling(app):
+    """按配置启用请求性能分析，未启用时不注册任何钩子"""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    app.extensions['profiles'] = ProfileStore(app.config['PROFILING_MAX_PROFILES'])
+
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_discard_profile)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
@@ -1,3 +1,3 @@
-from . import auth, notes, todos, chat, ai
+from . import auth, notes, todos, chat, ai, stats, profiling
 
-__all__ = ['auth', 'notes', 'todos', 'chat', 'ai']
\ No newline at end of file
+__all__ = ['auth', 'notes', 'todos', 'chat', 'ai', 'stats', 'profiling']
\ No newline at end of file
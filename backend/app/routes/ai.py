@@ -4,6 +4,64 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 # 创建蓝图
 bp = Blueprint('ai', __name__)
 
+# 洞察分析合并后保留的关键词和问题数量
+MAX_KEYWORDS = 10
+MAX_QUESTIONS = 5
+
+def polish_chunk(chunk):
+    """润色单个文本分块，分块首尾的空白原样保留以便拼接"""
+    stripped = chunk.strip()
+    if not stripped:
+        return chunk
+
+    start = chunk.index(stripped)
+    # TODO: 调用OpenAI API进行文本润色
+    # 现在先返回一个简单的模拟响应
+    polished = f"[润色后] {stripped}"
+    return chunk[:start] + polished + chunk[start + len(stripped):]
+
+def continue_chunk(context):
+    """根据文本末尾的上下文生成续写内容"""
+    # TODO: 调用OpenAI API进行文本续写
+    # 现在先返回一个简单的模拟响应
+    return " [这是AI续写的内容]"
+
+def insight_chunk(chunk):
+    """分析单个文本分块"""
+    # TODO: 调用OpenAI API生成洞察分析
+    # 现在先返回一个简单的模拟响应
+    return {
+        'summary': '这是笔记的摘要内容...',
+        'keywords': ['关键词1', '关键词2', '关键词3'],
+        'questions': [
+            '问题1：基于笔记内容的思考题',
+            '问题2：基于笔记内容的思考题'
+        ]
+    }
+
+def reduce_insights(parts):
+    """合并各分块的洞察分析结果"""
+    if len(parts) == 1:
+        return parts[0]
+
+    # TODO: 调用OpenAI API把各分块摘要合并为整体摘要
+    summary = '\n'.join(dict.fromkeys(part['summary'] for part in parts))
+
+    # 关键词按出现的分块数排序，出现次数相同时保持原文顺序
+    counts = {}
+    for part in parts:
+        for keyword in dict.fromkeys(part['keywords']):
+            counts[keyword] = counts.get(keyword, 0) + 1
+    keywords = sorted(counts, key=lambda keyword: -counts[keyword])[:MAX_KEYWORDS]
+
+    questions = list(dict.fromkeys(q for part in parts for q in part['questions']))[:MAX_QUESTIONS]
+
+    return {
+        'summary': summary,
+        'keywords': keywords,
+        'questions': questions
+    }
+
 @bp.route('/ai/polish', methods=['POST'])
 @jwt_required()
 def polish_text():
@@ -14,9 +72,10 @@ def polish_text():
         if not data or 'text' not in data:
             return jsonify({'message': '文本内容是必需的'}), 400
 
-        # TODO: 调用OpenAI API进行文本润色
-        # 现在先返回一个简单的模拟响应
-        polished_text = f"[润色后] {data['text']}"
+        # 长文本分块并发润色，按原顺序拼接
+        pipeline = current_app.extensions['text_pipeline']
+        chunks = pipeline.split(data['text'])
+        polished_text = ''.join(pipeline.map('polish', polish_chunk, chunks))
 
         return jsonify({
             'original_text': data['text'],
@@ -37,9 +96,11 @@ def continue_text():
         if not data or 'text' not in data:
             return jsonify({'message': '文本内容是必需的'}), 400
 
-        # TODO: 调用OpenAI API进行文本续写
-        # 现在先返回一个简单的模拟响应
-        continued_text = f"{data['text']} [这是AI续写的内容]"
+        # 续写只依赖文本末尾，只把最后一个分块作为上下文发送给模型
+        pipeline = current_app.extensions['text_pipeline']
+        context = pipeline.split(data['text'])[-1]
+        # 续写结果每次都应不同，不做缓存
+        continued_text = data['text'] + pipeline.run(continue_chunk, context)
 
         return jsonify({
             'original_text': data['text'],
@@ -60,16 +121,10 @@ def generate_insight():
         if not data or 'content' not in data:
             return jsonify({'message': '笔记内容是必需的'}), 400
 
-        # TODO: 调用OpenAI API生成洞察分析
-        # 现在先返回一个简单的模拟响应
-        insight = {
-            'summary': '这是笔记的摘要内容...',
-            'keywords': ['关键词1', '关键词2', '关键词3'],
-            'questions': [
-                '问题1：基于笔记内容的思考题',
-                '问题2：基于笔记内容的思考题'
-            ]
-        }
+        # 分块并发分析，再合并为整体结果
+        pipeline = current_app.extensions['text_pipeline']
+        chunks = pipeline.split(data['content'])
+        insight = reduce_insights(pipeline.map('insight', insight_chunk, chunks))
 
         return jsonify(insight), 200
 
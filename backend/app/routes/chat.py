@@ -1,7 +1,9 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, ChatMessage
+from app.stats import record_activity
 
 # 创建蓝图
 bp = Blueprint('chat', __name__)
@@ -9,7 +11,11 @@ bp = Blueprint('chat', __name__)
 @bp.route('/chat', methods=['POST'])
 @jwt_required()
 def send_message():
-    """发送聊天消息"""
+    """发送聊天消息
+
+    启用 CHAT_WRITE_MODE=group/async 时消息由后台批量写入，返回的 user_message
+    尚未分配主键，其 id 为 None。
+    """
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
@@ -22,7 +28,7 @@ def send_message():
         user_message.user_id = user_id
         user_message.role = 'user'
         user_message.content = data['message']
-        db.session.add(user_message)
+        user_message.created_at = datetime.utcnow()
 
         # TODO: 调用OpenAI API获取AI回复
         # 现在先返回一个模拟回复
@@ -33,9 +39,17 @@ def send_message():
         ai_message.user_id = user_id
         ai_message.role = 'assistant'
         ai_message.content = ai_response
-        db.session.add(ai_message)
+        ai_message.created_at = datetime.utcnow()
 
-        db.session.commit()
+        writer = current_app.extensions.get('chat_writer')
+        if writer is not None:
+            # 后台批量写入，group 模式下会等待所在批次提交
+            writer.save(db.session.get_bind(mapper=ChatMessage), [user_message, ai_message])
+        else:
+            db.session.add(user_message)
+            db.session.add(ai_message)
+            record_activity(user_id, chat_messages=1)
+            db.session.commit()
 
         return jsonify({
             'user_message': user_message.to_dict(),
@@ -53,10 +67,22 @@ def send_message():
 @bp.route('/chat/history', methods=['GET'])
 @jwt_required()
 def get_chat_history():
-    """获取聊天历史"""
+    """获取聊天历史（最近50条，按时间正序）
+
+    启用后台批量写入时，尚未写入数据库的本人消息也会返回，其 id 为 None。
+    """
     try:
         user_id = get_jwt_identity()
-        messages = ChatMessage.query.filter_by(user_id=user_id).order_by(ChatMessage.created_at.asc()).limit(50).all()
+
+        # 先取出尚未写入数据库的消息，再查询数据库，保证用户能看到自己刚发送的消息
+        writer = current_app.extensions.get('chat_writer')
+        pending = writer.pending_for(user_id) if writer is not None else []
+
+        messages = ChatMessage.query.filter_by(user_id=user_id).order_by(ChatMessage.created_at.desc()).limit(50).all()
+        messages.reverse()
+
+        if pending:
+            messages = merge_pending_messages(messages, pending, limit=50)
 
         return jsonify({
             'messages': [msg.to_dict() for msg in messages]
@@ -72,6 +98,12 @@ def clear_chat_history():
     """清空聊天历史"""
     try:
         user_id = get_jwt_identity()
+
+        # 先把队列中的消息写入数据库，避免清空后又被写回
+        writer = current_app.extensions.get('chat_writer')
+        if writer is not None:
+            writer.flush()
+
         ChatMessage.query.filter_by(user_id=user_id).delete()
         db.session.commit()
 
@@ -80,4 +112,17 @@ def clear_chat_history():
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'清空聊天历史失败: {str(e)}')
-        return jsonify({'message': '清空聊天历史失败'}), 500
\ No newline at end of file
+        return jsonify({'message': '清空聊天历史失败'}), 500
+
+def merge_pending_messages(messages, pending, limit):
+    """合并数据库中的消息和尚未写入的消息，按时间排序去重后保留最新的 limit 条"""
+    seen = {(msg.role, msg.content, msg.created_at) for msg in messages}
+    merged = list(messages)
+
+    for msg in pending:
+        # 查询期间刚好写入数据库的消息会同时出现在两边
+        if (msg.role, msg.content, msg.created_at) not in seen:
+            merged.append(msg)
+
+    merged.sort(key=lambda msg: msg.created_at)
+    return merged[-limit:]
\ No newline at end of file
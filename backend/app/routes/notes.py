@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, Note
+from app.stats import record_activity
 
 # 创建蓝图
 bp = Blueprint('notes', __name__)
@@ -58,6 +59,7 @@ def create_note():
         note.user_id = user_id
 
         db.session.add(note)
+        record_activity(user_id, notes_created=1, chars_written=len(note.content))
         db.session.commit()
 
         current_app.logger.info(f'用户 {user_id} 创建了笔记: {note.title}')
@@ -86,12 +88,15 @@ def update_note(note_id):
         if not data:
             return jsonify({'message': '请提供更新数据'}), 400
 
+        old_length = len(note.content)
+
         # 更新字段
         if 'title' in data:
             note.title = data['title']
         if 'content' in data:
             note.content = data['content']
 
+        record_activity(user_id, notes_edited=1, chars_written=max(len(note.content) - old_length, 0))
         db.session.commit()
 
         current_app.logger.info(f'用户 {user_id} 更新了笔记: {note.title}')
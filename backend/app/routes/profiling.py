@@ -0,0 +1,53 @@
+from flask import Blueprint, jsonify, current_app
+from app.profiling import is_privileged_request
+
+# 创建蓝图（仅在 PROFILING_ENABLED 时注册）
+bp = Blueprint('profiling', __name__)
+
+# 详情接口返回的权重最高的调用栈数量
+TOP_STACKS = 20
+
+@bp.before_request
+def require_profiling_token():
+    """管理接口需要在请求头中携带性能分析令牌"""
+    if not is_privileged_request():
+        return jsonify({'message': '禁止访问'}), 403
+
+def summarize(profile):
+    """性能分析结果概要（不含调用栈）"""
+    return {key: value for key, value in profile.items() if key != 'stacks'}
+
+@bp.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """获取最近捕获的请求性能分析列表（仅限处理本次请求的 worker 进程）"""
+    profiles = current_app.extensions['profiles'].all()
+    return jsonify({'profiles': [summarize(profile) for profile in profiles]}), 200
+
+@bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """获取单个请求的性能分析详情"""
+    profile = current_app.extensions['profiles'].get(profile_id)
+
+    if not profile:
+        return jsonify({'message': '性能分析记录不存在'}), 404
+
+    data = summarize(profile)
+    data['top_stacks'] = [
+        {'stack': stack, 'weight': count}
+        for stack, count in profile['stacks'].most_common(TOP_STACKS)
+    ]
+    return jsonify({'profile': data}), 200
+
+@bp.route('/admin/profiles/<profile_id>/flamegraph', methods=['GET'])
+def get_flamegraph(profile_id):
+    """以 collapsed-stack 文本格式导出，可直接交给 flamegraph.pl 或 speedscope 生成火焰图"""
+    profile = current_app.extensions['profiles'].get(profile_id)
+
+    if not profile:
+        return jsonify({'message': '性能分析记录不存在'}), 404
+
+    if not profile['stacks']:
+        return jsonify({'message': profile.get('hint', '没有调用栈数据')}), 404
+
+    lines = [f'{stack} {count}' for stack, count in sorted(profile['stacks'].items())]
+    return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; charset=utf-8'}
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import User, DailyStats
+from app.stats import record_activity
+
+# 创建蓝图
+bp = Blueprint('stats', __name__)
+
+# 单次查询允许的最大天数
+MAX_RANGE_DAYS = 366
+
+@bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_stats():
+    """获取用户在指定日期范围内的每日统计（默认最近一年）"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=MAX_RANGE_DAYS - 1)
+        except ValueError:
+            return jsonify({'message': '日期格式应为 YYYY-MM-DD'}), 400
+
+        if start > end:
+            return jsonify({'message': '开始日期不能晚于结束日期'}), 400
+        if (end - start).days >= MAX_RANGE_DAYS:
+            return jsonify({'message': f'查询范围不能超过 {MAX_RANGE_DAYS} 天'}), 400
+
+        rows = DailyStats.query.filter(
+            DailyStats.user_id == user_id,
+            DailyStats.day.between(start, end)
+        ).order_by(DailyStats.day.asc()).all()
+
+        totals = {name: sum(getattr(row, name) for row in rows) for name in DailyStats.COUNTERS}
+
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'totals': totals,
+            'days': [row.to_dict() for row in rows]
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取统计数据失败: {str(e)}')
+        return jsonify({'message': '获取统计数据失败'}), 500
+
+@bp.route('/stats/pomodoro', methods=['POST'])
+@jwt_required()
+def log_pomodoro():
+    """记录一次完成的番茄钟"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+
+        minutes = data.get('minutes')
+        if minutes is None:
+            user = User.query.get(user_id)
+            if not user:
+                return jsonify({'message': '用户不存在'}), 404
+            minutes = user.pomodoro_work_duration
+
+        if not isinstance(minutes, int) or isinstance(minutes, bool) or not 0 < minutes <= 24 * 60:
+            return jsonify({'message': '番茄钟时长无效'}), 400
+
+        record_activity(user_id, pomodoro_sessions=1, pomodoro_minutes=minutes)
+        db.session.commit()
+
+        return jsonify({'message': '番茄钟已记录'}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'记录番茄钟失败: {str(e)}')
+        return jsonify({'message': '记录番茄钟失败'}), 500
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, Todo
+from app.stats import record_activity
 
 # 创建蓝图
 bp = Blueprint('todos', __name__)
@@ -50,6 +51,7 @@ def create_todo():
         todo.user_id = user_id
 
         db.session.add(todo)
+        record_activity(user_id, todos_created=1, todos_completed=1 if todo.is_completed else 0)
         db.session.commit()
 
         return jsonify({'todo': todo.to_dict()}), 201
@@ -72,6 +74,9 @@ def update_todo(todo_id):
 
         data = request.get_json()
         if 'is_completed' in data:
+            # 统计的是完成事件，重新标记为未完成不会扣减之前的计数
+            if data['is_completed'] and not todo.is_completed:
+                record_activity(user_id, todos_completed=1)
             todo.is_completed = data['is_completed']
 
         db.session.commit()
@@ -0,0 +1,270 @@
+import hashlib
+import os
+import threading
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateTable
+
+# 按用户分片存储的数据表，User 等认证数据始终保留在全局目录库中
+SHARDED_TABLES = ('notes', 'todos', 'chat_messages', 'daily_stats')
+
+
+def shard_key_for_user(user_id, mode, shard_count):
+    """根据用户ID计算稳定的分片键"""
+    if mode == 'tenant':
+        return f'u{int(user_id)}'
+
+    # 使用 md5 而不是 hash()，保证跨进程、跨重启结果一致
+    digest = hashlib.md5(str(int(user_id)).encode('utf-8')).hexdigest()
+    return str(int(digest, 16) % shard_count)
+
+
+class ShardRouter:
+    """分片路由器：管理各分片的数据库引擎"""
+
+    def __init__(self, app, db):
+        self.db = db
+        self.mode = app.config['SHARDING_MODE']
+        self.shard_count = app.config['SHARD_COUNT']
+        self.uri_template = app.config['SHARD_DATABASE_URI']
+        self.instance_path = app.instance_path
+        self._engines = {}
+        self._lock = threading.Lock()
+
+        if self.mode not in ('hash', 'tenant'):
+            raise ValueError(f'未知的分片模式: {self.mode}')
+        if self.mode == 'hash' and self.shard_count < 1:
+            raise ValueError('SHARD_COUNT 必须大于 0')
+
+    def shard_key(self, user_id, shard_count=None):
+        """计算用户所在的分片键"""
+        return shard_key_for_user(user_id, self.mode, shard_count or self.shard_count)
+
+    def engine_for_user(self, user_id):
+        """获取用户所在分片的数据库引擎"""
+        return self.engine_for_key(self.shard_key(user_id))
+
+    def engine_for_key(self, key):
+        """获取指定分片键的数据库引擎，首次访问时创建引擎和数据表"""
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                # tenant 模式每个用户一个库，不为每个库保留连接池，避免打开的文件句柄随用户数增长
+                options = {'poolclass': NullPool} if self.mode == 'tenant' else {}
+                engine = sa.create_engine(self._make_uri(key), **options)
+                self._create_tables(engine)
+                self._engines[key] = engine
+
+        return engine
+
+    def _create_tables(self, engine):
+        """在分片库中建表，不创建指向 users 表的外键（users 只存在于全局目录库）"""
+        with engine.begin() as conn:
+            inspector = sa.inspect(conn)
+            for table in self.tables():
+                if inspector.has_table(table.name):
+                    continue
+                conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+                for index in table.indexes:
+                    index.create(conn)
+
+    def tables(self):
+        """返回需要分片的数据表对象"""
+        return [self.db.metadata.tables[name] for name in SHARDED_TABLES]
+
+    def _make_uri(self, key):
+        """生成分片数据库URI，SQLite 相对路径与 Flask-SQLAlchemy 一样放在实例目录下"""
+        url = sa.engine.make_url(self.uri_template.format(shard=key))
+
+        if url.drivername.startswith('sqlite') and url.database not in (None, '', ':memory:'):
+            if not os.path.isabs(url.database):
+                os.makedirs(self.instance_path, exist_ok=True)
+                url = url.set(database=os.path.join(self.instance_path, url.database))
+
+        return url
+
+
+class RoutingSession(Session):
+    """按当前请求的 JWT 身份把分片数据表路由到对应分片的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            router = current_app.extensions.get('sharding')
+            table = _mapper_or_clause_table(mapper, clause)
+
+            if router is not None and table is not None and table.name in SHARDED_TABLES:
+                return router.engine_for_user(current_shard_user())
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mapper_or_clause_table(mapper, clause):
+    """找出本次操作涉及的数据表"""
+    if mapper is not None:
+        return sa.inspect(mapper).local_table
+    if isinstance(clause, sa.Table):
+        return clause
+    return None
+
+
+def current_shard_user():
+    """获取当前请求用于分片路由的用户ID"""
+    user_id = get_jwt_identity()
+    if user_id is None:
+        raise RuntimeError('分片模式下访问用户数据前必须先确定用户身份')
+    return user_id
+
+
+def move_user_rows(user_id, source, target):
+    """把一个用户的分片数据从 source 引擎搬到 target 引擎
+
+    尽量保留原主键，客户端持有的笔记和待办ID在迁移后仍然有效；只有主键已被
+    目标库中其他记录占用时才重新分配。目标库中已存在的相同记录会被跳过，
+    因此中途失败（目标库已提交、源库未删除）后可以安全地重新执行。
+
+    每日统计按 (user_id, day) 累加合并到目标库已有的汇总行中：用户在迁移前
+    已经在新分片产生的统计不会冲突。只有在目标库已提交、源库未删除的极短窗口
+    内失败后重新执行，才会重复累加这部分统计。
+    """
+    from app.models import DailyStats
+    from app.stats import apply_activity
+
+    tables = current_app.extensions['sharding'].tables()
+    moved = 0
+
+    with source.begin() as src, target.begin() as dst:
+        for table in tables:
+            rows = src.execute(table.select().where(table.c.user_id == user_id)).mappings().all()
+
+            if table is DailyStats.__table__:
+                for row in rows:
+                    apply_activity(dst, user_id, row['day'], **{name: row[name] for name in DailyStats.COUNTERS})
+                moved += len(rows)
+                src.execute(table.delete().where(table.c.user_id == user_id))
+                continue
+
+            rows = _rows_missing_from(dst, table, user_id, rows)
+
+            if rows:
+                taken = set(dst.execute(
+                    sa.select(table.c.id).where(table.c.id.in_([row['id'] for row in rows]))
+                ).scalars())
+                dst.execute(table.insert(), [
+                    {k: v for k, v in row.items() if k != 'id' or v not in taken} for row in rows
+                ])
+                _sync_id_sequence(dst, table)
+                moved += len(rows)
+
+            src.execute(table.delete().where(table.c.user_id == user_id))
+
+    return moved
+
+
+def _rows_missing_from(conn, table, user_id, rows):
+    """过滤掉目标库中已经存在（除主键外各列都相同）的记录"""
+    if not rows:
+        return rows
+
+    columns = [column.name for column in table.columns if column.name != 'id']
+    existing = {
+        tuple(row[name] for name in columns)
+        for row in conn.execute(table.select().where(table.c.user_id == user_id)).mappings()
+    }
+    return [row for row in rows if tuple(row[name] for name in columns) not in existing]
+
+
+def _sync_id_sequence(conn, table):
+    """显式写入主键后，PostgreSQL 需要把自增序列推进到当前最大值"""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(sa.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+shards_cli = AppGroup('shards', help='分片数据管理命令')
+
+
+@shards_cli.command('migrate')
+def migrate_to_shards():
+    """把全局数据库中的笔记、待办和聊天数据迁移到各用户的分片"""
+    router = _require_router()
+    users = router.db.metadata.tables['users']
+    source = router.db.engine
+
+    with source.connect() as conn:
+        user_ids = conn.execute(sa.select(users.c.id)).scalars().all()
+
+    _move_users(
+        (user_id, source, router.engine_for_user(user_id), f'迁移到分片 {router.shard_key(user_id)}')
+        for user_id in user_ids
+    )
+
+
+@shards_cli.command('rebalance')
+@click.option('--from-count', type=int, required=True, help='调整前的分片数量')
+def rebalance_shards(from_count):
+    """修改 SHARD_COUNT 后，把用户数据搬到新的分片"""
+    router = _require_router()
+    if router.mode != 'hash':
+        raise click.ClickException('只有 hash 分片模式需要重新平衡')
+
+    users = router.db.metadata.tables['users']
+    with router.db.engine.connect() as conn:
+        user_ids = conn.execute(sa.select(users.c.id)).scalars().all()
+
+    moves = []
+    for user_id in user_ids:
+        old_key = router.shard_key(user_id, from_count)
+        new_key = router.shard_key(user_id)
+        if old_key != new_key:
+            moves.append((user_id, router.engine_for_key(old_key), router.engine_for_key(new_key),
+                          f'分片 {old_key} -> {new_key}'))
+
+    _move_users(moves)
+
+
+def _move_users(moves):
+    """依次搬迁用户数据，单个用户失败时报告错误并继续处理其他用户"""
+    failed = []
+
+    for user_id, source, target, description in moves:
+        try:
+            moved = move_user_rows(user_id, source, target)
+        except Exception as e:
+            failed.append(user_id)
+            click.echo(f'用户 {user_id}: {description} 失败: {str(e)}', err=True)
+            continue
+
+        if moved:
+            click.echo(f'用户 {user_id}: {description}，搬迁 {moved} 条记录')
+
+    if failed:
+        raise click.ClickException(f'{len(failed)} 个用户搬迁失败: {", ".join(map(str, failed))}，修复后可重新执行')
+
+
+def _require_router():
+    router = current_app.extensions.get('sharding')
+    if router is None:
+        raise click.ClickException('未启用分片模式，请设置 SHARDING_MODE')
+    return router
+
+
+def init_sharding(app, db):
+    """按配置启用分片路由"""
+    app.cli.add_command(shards_cli)
+
+    if app.config.get('SHARDING_MODE', 'off') == 'off':
+        return
+
+    app.extensions['sharding'] = ShardRouter(app, db)
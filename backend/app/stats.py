@@ -0,0 +1,59 @@
+from datetime import date, datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import DailyStats
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的数据库
+_UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def apply_activity(conn, user_id, day, **deltas):
+    """在给定数据库连接上累加某个用户某一天的统计计数"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    table = DailyStats.__table__
+    now = datetime.utcnow()
+
+    row = {name: 0 for name in DailyStats.COUNTERS}
+    row.update(deltas)
+    row.update(user_id=user_id, day=day, updated_at=now)
+
+    upsert_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if upsert_insert is not None:
+        # 单条语句原子地插入或累加，并发创建同一天的汇总行也不会冲突
+        stmt = upsert_insert(table).values(**row)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'day'],
+            set_=dict(
+                {name: table.c[name] + stmt.excluded[name] for name in deltas},
+                updated_at=now
+            )
+        ))
+        return
+
+    # 其他数据库：先尝试原地累加，没有汇总行时在保存点中插入，与并发插入冲突时重新累加
+    update = (
+        table.update()
+        .where(table.c.user_id == user_id, table.c.day == day)
+        .values(updated_at=now, **{name: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if conn.execute(update).rowcount:
+        return
+
+    try:
+        with conn.begin_nested():
+            conn.execute(table.insert().values(**row))
+    except IntegrityError:
+        conn.execute(update)
+
+
+def record_activity(user_id, **deltas):
+    """在当前会话的事务中记录用户今天的活动，与业务数据一起提交或回滚"""
+    conn = db.session.connection(bind_arguments={'mapper': DailyStats})
+    apply_activity(conn, user_id, date.today(), **deltas)
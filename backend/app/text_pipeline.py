@@ -0,0 +1,181 @@
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask import current_app
+
+# 段落之间的空行
+_PARAGRAPH_RE = re.compile(r'(\n[ \t]*\n\s*)')
+# 句末标点之后断句（英文句号后需跟空白，避免拆开小数和缩写）
+_SENTENCE_RE = re.compile(r'(?<=[。！？!?；;\n])|(?<=\.)(?=\s)')
+# 中日韩字符按一个 token 估算，其余字符约 4 个一个 token
+_CJK_RE = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+# 分块时每遇到约 1/_ANCHOR_MODULUS 的段落就在其后断开，
+# 使分块边界由内容决定，局部修改不会让后面所有分块都发生变化
+_ANCHOR_MODULUS = 4
+
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数量"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_text(text, max_tokens):
+    """在段落和句子边界把文本切分为不超过 max_tokens 的分块
+
+    所有分块按顺序拼接后与原文完全一致。
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for unit, is_paragraph in _units(text, max_tokens):
+        tokens = estimate_tokens(unit)
+
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+
+        current.append(unit)
+        current_tokens += tokens
+
+        if is_paragraph and zlib.crc32(unit.encode('utf-8')) % _ANCHOR_MODULUS == 0:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+
+    if current:
+        chunks.append(''.join(current))
+
+    return chunks
+
+
+def _units(text, max_tokens):
+    """依次产出 (片段, 是否为完整段落)，过长的段落拆成句子，过长的句子按字符硬切"""
+    parts = _PARAGRAPH_RE.split(text)
+
+    # 把段落和其后的空行合并在一起
+    paragraphs = [''.join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+
+    for paragraph in paragraphs:
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph, True
+            continue
+
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if not sentence:
+                continue
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence, False
+                continue
+
+            for piece in _hard_split(sentence, max_tokens):
+                yield piece, False
+
+
+def _hard_split(text, max_tokens):
+    """没有标点可用时按字符切分"""
+    start, tokens = 0, 0.0
+    for index, char in enumerate(text):
+        cost = 1 if _CJK_RE.match(char) else 0.25
+        if tokens + cost > max_tokens and index > start:
+            yield text[start:index]
+            start, tokens = index, 0.0
+        tokens += cost
+    yield text[start:]
+
+
+class ChunkCache:
+    """按内容哈希缓存分块处理结果的 LRU 缓存"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+class TextPipeline:
+    """长文本分块并发处理：分块 -> 有界线程池并发处理 -> 按顺序合并"""
+
+    def __init__(self, app):
+        self.max_tokens = app.config['AI_CHUNK_MAX_TOKENS']
+        self.max_in_flight = app.config['AI_MAX_CHUNKS_IN_FLIGHT']
+        self.model = app.config['OPENAI_MODEL']
+        self.cache = ChunkCache(app.config['AI_CHUNK_CACHE_SIZE'])
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['AI_MAX_WORKERS'],
+            thread_name_prefix='ai-chunk'
+        )
+
+    def split(self, text):
+        return split_text(text, self.max_tokens) or [text]
+
+    def map(self, task, func, chunks):
+        """对每个分块执行 func，结果按分块顺序返回
+
+        只适用于结果由分块内容决定的任务：未变化的分块直接使用缓存。
+        单个请求同时占用的线程数不超过 AI_MAX_CHUNKS_IN_FLIGHT，避免长文本独占线程池。
+        """
+        app = current_app._get_current_object()
+        results = [None] * len(chunks)
+        todo = []
+
+        for index, chunk in enumerate(chunks):
+            key = self._cache_key(task, chunk)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                todo.append((index, key, chunk))
+
+        running = {}
+        while todo or running:
+            while todo and len(running) < self.max_in_flight:
+                index, key, chunk = todo.pop(0)
+                running[self.executor.submit(_run_in_app_context, app, func, chunk)] = (index, key)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = running.pop(future)
+                results[index] = future.result()
+                self.cache.set(key, results[index])
+
+        return results
+
+    def run(self, func, text):
+        """在线程池中执行一次不缓存的处理（如每次结果都应不同的续写）"""
+        app = current_app._get_current_object()
+        return self.executor.submit(_run_in_app_context, app, func, text).result()
+
+    def _cache_key(self, task, chunk):
+        digest = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+        return f'{task}:{self.model}:{digest}'
+
+
+def _run_in_app_context(app, func, chunk):
+    with app.app_context():
+        return func(chunk)
+
+
+def init_text_pipeline(app):
+    """创建 AI 长文本处理管道"""
+    app.extensions['text_pipeline'] = TextPipeline(app)
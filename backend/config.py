@@ -11,6 +11,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ai_notebook.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 分片配置：'off' 不分片，'hash' 按用户ID哈希到 SHARD_COUNT 个库，'tenant' 每个用户一个库
+    # 用户和认证数据始终保存在 SQLALCHEMY_DATABASE_URI 指向的全局目录库中
+    SHARDING_MODE = os.environ.get('SHARDING_MODE') or 'off'
+    SHARD_COUNT = int(os.environ.get('SHARD_COUNT') or 4)
+    SHARD_DATABASE_URI = os.environ.get('SHARD_DATABASE_URL') or 'sqlite:///ai_notebook_shard_{shard}.db'
+
+    # 聊天消息写入模式：'sync' 每条请求同步提交；'group' 组提交，请求等待所在批次提交后返回；
+    # 'async' 后台写入，请求立即返回，进程崩溃时可能丢失最近一个刷新间隔内的消息
+    CHAT_WRITE_MODE = os.environ.get('CHAT_WRITE_MODE') or 'sync'
+    CHAT_FLUSH_INTERVAL_MS = int(os.environ.get('CHAT_FLUSH_INTERVAL_MS') or 10)
+    CHAT_FLUSH_BATCH_SIZE = int(os.environ.get('CHAT_FLUSH_BATCH_SIZE') or 100)
+
     # JWT配置
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
@@ -20,6 +32,21 @@ class Config:
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY') or ''
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL') or 'gpt-3.5-turbo'
 
+    # AI长文本分块处理配置
+    AI_CHUNK_MAX_TOKENS = int(os.environ.get('AI_CHUNK_MAX_TOKENS') or 1500)  # 每个分块的token上限
+    AI_MAX_WORKERS = int(os.environ.get('AI_MAX_WORKERS') or 4)  # 并发处理分块的线程数
+    AI_MAX_CHUNKS_IN_FLIGHT = int(os.environ.get('AI_MAX_CHUNKS_IN_FLIGHT') or 2)  # 单个请求同时处理的分块数
+    AI_CHUNK_CACHE_SIZE = int(os.environ.get('AI_CHUNK_CACHE_SIZE') or 1024)  # 分块结果缓存条数
+
+    # 请求性能分析配置：请求头携带令牌或按采样率触发，结果保存在进程内存中
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN') or ''
+    PROFILING_HEADER = 'X-Profile-Token'
+    PROFILING_MODE = os.environ.get('PROFILING_MODE') or 'sampling'  # 'sampling' 低开销采样，'deterministic' 精确跟踪
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 0)  # 0~1，随机采样的请求比例
+    PROFILING_INTERVAL_MS = int(os.environ.get('PROFILING_INTERVAL_MS') or 5)  # 调用栈采样间隔，过小会与请求线程争抢 GIL
+    PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES') or 100)  # 每个 worker 进程在内存中各自保留的条数
+
     # CORS配置
     CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
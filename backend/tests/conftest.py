@@ -0,0 +1,52 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import TestingConfig
+
+
+@pytest.fixture
+def app():
+    """测试用应用实例（内存数据库）"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def sharded_app(tmp_path, monkeypatch):
+    """启用 hash 分片的应用实例，目录库和分片库都是临时目录中的 SQLite 文件"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/directory.db')
+    monkeypatch.setattr(TestingConfig, 'SHARDING_MODE', 'hash')
+    monkeypatch.setattr(TestingConfig, 'SHARD_COUNT', 2)
+    monkeypatch.setattr(TestingConfig, 'SHARD_DATABASE_URI', f'sqlite:///{tmp_path}/shard_{{shard}}.db')
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in app.extensions['sharding']._engines.values():
+            engine.dispose()
+
+
+def make_user(username, **fields):
+    """在全局目录库中创建用户，返回用户ID"""
+    user = User.from_dict({'username': username, 'email': f'{username}@example.com', 'password': 'secret'})
+    for name, value in fields.items():
+        setattr(user, name, value)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def auth_headers(user_id):
+    # 使用字符串 identity，兼容要求 sub 为字符串的新版 PyJWT
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.chat_writer import ChatWriteBehind
+from app.models import ChatMessage
+from app.routes.chat import merge_pending_messages
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sa.create_engine(f'sqlite:///{tmp_path}/chat.db')
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_writer(app):
+    writers = []
+
+    def make(mode='async', interval_ms=60000, batch_size=1000):
+        app.config.update(
+            CHAT_WRITE_MODE=mode,
+            CHAT_FLUSH_INTERVAL_MS=interval_ms,
+            CHAT_FLUSH_BATCH_SIZE=batch_size,
+        )
+        writer = ChatWriteBehind(app, ChatMessage.__table__)
+        writers.append(writer)
+        return writer
+
+    yield make
+
+    for writer in writers:
+        writer.close()
+
+
+def make_message(content, user_id=1, role='user', created_at=None):
+    message = ChatMessage()
+    message.user_id = user_id
+    message.role = role
+    message.content = content
+    message.created_at = created_at or datetime.utcnow()
+    return message
+
+
+def stored_contents(engine):
+    table = ChatMessage.__table__
+    with engine.connect() as conn:
+        return conn.execute(sa.select(table.c.content).order_by(table.c.id)).scalars().all()
+
+
+def test_flushes_when_batch_is_full(engine, make_writer):
+    writer = make_writer(batch_size=2)
+
+    ticket = writer.enqueue(engine, [make_message('a'), make_message('b')])
+    ticket.wait(timeout=5)
+
+    assert stored_contents(engine) == ['a', 'b']
+
+
+def test_flushes_after_interval(engine, make_writer):
+    writer = make_writer(interval_ms=20)
+
+    ticket = writer.enqueue(engine, [make_message('a')])
+    ticket.wait(timeout=5)
+
+    assert stored_contents(engine) == ['a']
+
+
+def test_close_flushes_queued_messages(engine, make_writer):
+    writer = make_writer()
+
+    writer.enqueue(engine, [make_message('a'), make_message('b', role='assistant')])
+    assert stored_contents(engine) == []
+
+    writer.close()
+
+    assert stored_contents(engine) == ['a', 'b']
+
+
+def test_pending_messages_are_merged_into_history(make_writer, engine):
+    writer = make_writer()
+    start = datetime.utcnow()
+
+    stored = [make_message(f'm{i}', created_at=start + timedelta(seconds=i)) for i in range(50)]
+    pending = make_message('LAST', created_at=start + timedelta(seconds=100))
+    writer.enqueue(engine, [pending, make_message('other user', user_id=2)])
+
+    assert writer.pending_for(1) == [pending]
+
+    # 查询期间刚写入数据库的消息同时出现在两边时只保留一条
+    merged = merge_pending_messages(stored, writer.pending_for(1) + [stored[-1]], limit=50)
+
+    assert len(merged) == 50
+    assert merged[-1] is pending
+    assert merged[0].content == 'm1'
+
+
+def test_failed_async_batch_is_retried_then_dropped(make_writer, tmp_path):
+    writer = make_writer()
+    broken = sa.create_engine(f'sqlite:///{tmp_path}/empty.db')
+
+    writer.enqueue(broken, [make_message('a')])
+
+    for _ in range(writer.MAX_ATTEMPTS - 1):
+        writer.flush()
+        assert [message.content for message in writer.pending_for(1)] == ['a']
+
+    writer.flush()
+    assert writer.pending_for(1) == []
+
+
+def test_group_save_waits_for_commit(engine, make_writer):
+    writer = make_writer(mode='group', interval_ms=20)
+
+    writer.save(engine, [make_message('a'), make_message('b', role='assistant')])
+
+    assert stored_contents(engine) == ['a', 'b']
+    assert writer.pending_for(1) == []
+
+
+def test_group_save_raises_database_error(make_writer, tmp_path):
+    writer = make_writer(mode='group', interval_ms=20)
+    broken = sa.create_engine(f'sqlite:///{tmp_path}/empty.db')
+
+    with pytest.raises(sa.exc.OperationalError):
+        writer.save(broken, [make_message('a')])
+
+    # group 模式失败后不再重试，由请求返回错误
+    assert writer.pending_for(1) == []
+
+
+def test_group_save_timeout_withdraws_queued_messages(engine, make_writer):
+    writer = make_writer(mode='group')
+    writer.WAIT_TIMEOUT = 0.05
+
+    with pytest.raises(TimeoutError):
+        writer.save(engine, [make_message('a')])
+
+    assert writer.pending_for(1) == []
+    writer.close()
+    assert stored_contents(engine) == []
+
+
+def test_cancel_treats_written_batch_as_saved(engine, make_writer):
+    writer = make_writer(mode='group')
+
+    ticket = writer.enqueue(engine, [make_message('a')])
+    writer.flush()
+
+    # 批次刚写完时等待超时的请求应当拿到写入结果，而不是报错
+    assert writer._cancel(ticket) is True
+    ticket.wait(timeout=0)
+    assert stored_contents(engine) == ['a']
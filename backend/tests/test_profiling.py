@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from app import create_app, db
+from app.profiling import _start_profile
+from config import TestingConfig
+from conftest import auth_headers, make_user
+
+TOKEN = 'secret-token'
+
+
+@pytest.fixture
+def profiling_app(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(TestingConfig, 'PROFILING_TOKEN', TOKEN)
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def test_disabled_registers_no_hooks_or_routes(app):
+    assert 'profiles' not in app.extensions
+    assert _start_profile not in app.before_request_funcs.get(None, [])
+    assert not [rule for rule in app.url_map.iter_rules() if rule.rule.startswith('/api/admin')]
+
+
+def test_request_with_token_is_captured_with_sql_stats(profiling_app):
+    client = profiling_app.test_client()
+    user_id = make_user('alice')
+    headers = dict(auth_headers(user_id), **{'X-Profile-Token': TOKEN})
+
+    response = client.get('/api/notes', headers=headers)
+    assert response.status_code == 200
+
+    response = client.get('/api/admin/profiles', headers={'X-Profile-Token': TOKEN})
+    assert response.status_code == 200
+    profiles = response.get_json()['profiles']
+
+    assert len(profiles) == 1
+    profile = profiles[0]
+    assert profile['route'] == '/api/notes'
+    assert profile['user_id'] == str(user_id)
+    assert profile['pid'] == os.getpid()
+    assert profile['sql']['count'] > 0
+    assert profile['sql']['slowest']
+
+
+def test_request_without_token_is_not_captured(profiling_app):
+    client = profiling_app.test_client()
+    user_id = make_user('alice')
+
+    client.get('/api/notes', headers=auth_headers(user_id))
+
+    assert profiling_app.extensions['profiles'].all() == []
+
+
+def test_non_ascii_token_is_rejected_without_error(profiling_app):
+    client = profiling_app.test_client()
+    headers = {'X-Profile-Token': 'caf\xe9'.encode('latin-1')}
+
+    assert client.get('/api/notes', headers=headers).status_code == 401
+    assert client.get('/api/admin/profiles', headers=headers).status_code == 403
@@ -0,0 +1,141 @@
+from datetime import date
+
+import sqlalchemy as sa
+from flask_jwt_extended import verify_jwt_in_request
+from app import db
+from app.models import DailyStats, Note, Todo, User
+from app.sharding import move_user_rows
+from conftest import auth_headers, make_user
+
+NOTES = Note.__table__
+STATS = DailyStats.__table__
+
+
+def insert_notes(engine, user_id, ids):
+    with engine.begin() as conn:
+        conn.execute(NOTES.insert(), [
+            {'id': note_id, 'user_id': user_id, 'title': f'note {note_id}', 'content': 'c'}
+            for note_id in ids
+        ])
+
+
+def note_ids(engine, user_id):
+    with engine.connect() as conn:
+        return sorted(conn.execute(
+            sa.select(NOTES.c.id).where(NOTES.c.user_id == user_id)
+        ).scalars())
+
+
+def rollup(engine, user_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            sa.select(STATS.c.day, STATS.c.notes_created).where(STATS.c.user_id == user_id)
+        ).all()
+
+
+def test_get_bind_routes_sharded_tables_to_users_shard(sharded_app):
+    router = sharded_app.extensions['sharding']
+    user_id = make_user('alice')
+
+    with sharded_app.test_request_context(headers=auth_headers(user_id)):
+        verify_jwt_in_request()
+
+        assert db.session.get_bind(mapper=Note) is router.engine_for_user(user_id)
+        assert db.session.get_bind(mapper=Todo) is router.engine_for_user(user_id)
+        assert db.session.get_bind(mapper=User) is db.engine
+
+
+def test_move_keeps_ids_and_can_be_rerun(sharded_app):
+    user_id = make_user('alice')
+    target = sharded_app.extensions['sharding'].engine_for_user(user_id)
+    insert_notes(db.engine, user_id, [5, 7])
+    with db.engine.connect() as conn:
+        rows = conn.execute(NOTES.select()).mappings().all()
+
+    assert move_user_rows(user_id, db.engine, target) == 2
+    assert note_ids(target, user_id) == [5, 7]
+    assert note_ids(db.engine, user_id) == []
+
+    # 模拟目标库已提交、源库删除未提交的中途失败
+    with db.engine.begin() as conn:
+        conn.execute(NOTES.insert(), [dict(row) for row in rows])
+    assert move_user_rows(user_id, db.engine, target) == 0
+
+    assert note_ids(target, user_id) == [5, 7]
+
+
+def test_move_assigns_new_id_only_on_conflict(sharded_app):
+    alice, bob = make_user('alice'), make_user('bob')
+    target = sharded_app.extensions['sharding'].engine_for_key('0')
+    insert_notes(target, bob, [5])
+    insert_notes(db.engine, alice, [5, 6])
+
+    move_user_rows(alice, db.engine, target)
+
+    ids = note_ids(target, alice)
+    assert 6 in ids and 5 not in ids and len(ids) == 2
+    assert note_ids(target, bob) == [5]
+
+
+def test_move_merges_existing_daily_rollup(sharded_app):
+    user_id = make_user('alice')
+    target = sharded_app.extensions['sharding'].engine_for_user(user_id)
+    today = date.today()
+
+    # 迁移前用户已经在新分片上写过数据
+    with target.begin() as conn:
+        conn.execute(STATS.insert().values(user_id=user_id, day=today, notes_created=1))
+    with db.engine.begin() as conn:
+        conn.execute(STATS.insert().values(user_id=user_id, day=today, notes_created=2))
+
+    move_user_rows(user_id, db.engine, target)
+
+    assert rollup(target, user_id) == [(today, 3)]
+    assert rollup(db.engine, user_id) == []
+
+
+def test_migrate_continues_after_a_user_fails(sharded_app, monkeypatch):
+    users = [make_user(name) for name in ('alice', 'bob', 'carol')]
+    for index, user_id in enumerate(users):
+        insert_notes(db.engine, user_id, [index + 1])
+
+    import app.sharding as sharding
+    original = sharding.move_user_rows
+
+    def failing_for_first_user(user_id, source, target):
+        if user_id == users[0]:
+            raise RuntimeError('boom')
+        return original(user_id, source, target)
+
+    monkeypatch.setattr(sharding, 'move_user_rows', failing_for_first_user)
+    result = sharded_app.test_cli_runner().invoke(args=['shards', 'migrate'])
+
+    router = sharded_app.extensions['sharding']
+    assert result.exit_code != 0
+    assert note_ids(db.engine, users[0]) == [1]
+    for index, user_id in enumerate(users[1:], start=2):
+        assert note_ids(router.engine_for_user(user_id), user_id) == [index]
+
+
+def test_rebalance_moves_only_users_whose_shard_changed(sharded_app):
+    router = sharded_app.extensions['sharding']
+    users = [make_user(f'user{i}') for i in range(6)]
+
+    # 原来只有一个分片，所有用户都在分片 0
+    old_shard = router.engine_for_key('0')
+    for user_id in users:
+        insert_notes(old_shard, user_id, [user_id])
+
+    result = sharded_app.test_cli_runner().invoke(args=['shards', 'rebalance', '--from-count', '1'])
+    assert result.exit_code == 0
+
+    moved = [user_id for user_id in users if router.shard_key(user_id) != '0']
+    assert moved and len(moved) < len(users)
+    for user_id in users:
+        expected = router.engine_for_key(router.shard_key(user_id))
+        assert note_ids(expected, user_id) == [user_id]
+        if user_id in moved:
+            assert note_ids(old_shard, user_id) == []
+            assert f'用户 {user_id}:' in result.output
+        else:
+            assert f'用户 {user_id}:' not in result.output
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.models import DailyStats
+from app.stats import apply_activity
+from conftest import auth_headers, make_user
+
+STATS = DailyStats.__table__
+
+
+@pytest.fixture
+def user_id(app):
+    return make_user('alice', pomodoro_work_duration=30)
+
+
+def stored_rollups():
+    with db.engine.connect() as conn:
+        return conn.execute(sa.select(STATS)).mappings().all()
+
+
+def test_upsert_adds_counters_for_same_day(app, user_id):
+    today = date.today()
+
+    with db.engine.begin() as conn:
+        apply_activity(conn, user_id, today, notes_created=1, chars_written=10)
+    with db.engine.begin() as conn:
+        apply_activity(conn, user_id, today, notes_created=2, chat_messages=1)
+
+    rows = stored_rollups()
+    assert len(rows) == 1
+    assert rows[0]['notes_created'] == 3
+    assert rows[0]['chars_written'] == 10
+    assert rows[0]['chat_messages'] == 1
+
+
+def test_get_stats_returns_range_and_totals(client, user_id):
+    with db.engine.begin() as conn:
+        apply_activity(conn, user_id, date(2024, 3, 1), notes_created=2)
+        apply_activity(conn, user_id, date(2024, 3, 5), notes_created=1)
+        apply_activity(conn, user_id, date(2024, 4, 1), notes_created=7)
+
+    response = client.get('/api/stats?start=2024-03-01&end=2024-03-31', headers=auth_headers(user_id))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['totals']['notes_created'] == 3
+    assert [day['date'] for day in body['days']] == ['2024-03-01', '2024-03-05']
+
+
+@pytest.mark.parametrize('query', [
+    'start=2024-13-01',
+    'end=yesterday',
+    'start=2024-03-02&end=2024-03-01',
+    'start=2023-01-01&end=2024-01-02',
+])
+def test_get_stats_rejects_invalid_range(client, user_id, query):
+    response = client.get(f'/api/stats?{query}', headers=auth_headers(user_id))
+
+    assert response.status_code == 400
+
+
+def test_get_stats_allows_maximum_range(client, user_id):
+    end = date(2024, 12, 31)
+    start = end - timedelta(days=365)
+
+    response = client.get(f'/api/stats?start={start}&end={end}', headers=auth_headers(user_id))
+
+    assert response.status_code == 200
+
+
+def test_pomodoro_defaults_to_work_duration(client, user_id):
+    response = client.post('/api/stats/pomodoro', headers=auth_headers(user_id))
+
+    assert response.status_code == 201
+    rows = stored_rollups()
+    assert rows[0]['pomodoro_sessions'] == 1
+    assert rows[0]['pomodoro_minutes'] == 30
+
+
+@pytest.mark.parametrize('minutes', [True, 0, -5, 24 * 60 + 1, 12.5, '25'])
+def test_pomodoro_rejects_invalid_minutes(client, user_id, minutes):
+    response = client.post('/api/stats/pomodoro', json={'minutes': minutes}, headers=auth_headers(user_id))
+
+    assert response.status_code == 400
+    assert stored_rollups() == []
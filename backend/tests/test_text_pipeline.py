@@ -0,0 +1,60 @@
+from app.text_pipeline import estimate_tokens, split_text
+
+MAX_TOKENS = 50
+
+
+def make_note(paragraphs=40):
+    """生成由中英文段落组成的长笔记"""
+    sentences = ['今天学习了新的内容。', 'The quick brown fox jumps. ', '记录一下想法！', 'Notes 3.14 are fine; ']
+    return '\n\n'.join(
+        ''.join(sentences[(i + j) % len(sentences)] for j in range(i % 7 + 1)) + f'第{i}段'
+        for i in range(paragraphs)
+    )
+
+
+def test_split_rejoins_to_original():
+    texts = [
+        make_note(),
+        '',
+        '短文本',
+        '长' * 500,
+        'x' * 1000,
+        '第一段\n\n\n  第二段\n\n' + '没有标点的长句' * 40 + '\n',
+    ]
+    for text in texts:
+        assert ''.join(split_text(text, MAX_TOKENS)) == text
+
+
+def test_chunks_stay_within_token_budget():
+    text = make_note() + '\n\n' + '长' * 500 + '\n\n' + 'x' * 1000
+    chunks = split_text(text, MAX_TOKENS)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= MAX_TOKENS for chunk in chunks)
+
+
+def test_local_edit_changes_only_nearby_chunks():
+    text = make_note(paragraphs=60)
+    paragraphs = text.split('\n\n')
+    paragraphs[30] += '补充一句。'
+    edited = '\n\n'.join(paragraphs)
+
+    before = split_text(text, MAX_TOKENS)
+    after = split_text(edited, MAX_TOKENS)
+
+    changed = [chunk for chunk in after if chunk not in before]
+    assert 1 <= len(changed) <= 3
+    assert len(after) > 10
+
+
+def test_map_reuses_cached_chunks(app):
+    pipeline = app.extensions['text_pipeline']
+    calls = []
+
+    def upper(chunk):
+        calls.append(chunk)
+        return chunk.upper()
+
+    assert pipeline.map('test-upper', upper, ['a', 'b']) == ['A', 'B']
+    assert pipeline.map('test-upper', upper, ['a', 'c']) == ['A', 'C']
+    assert calls.count('a') == 1